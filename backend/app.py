@@ -1,32 +1,52 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import random
 import time
 from collections import defaultdict, deque
 from contextlib import asynccontextmanager
 from decimal import Decimal
 import json
 import logging
-from typing import Any, Deque, Dict, Optional
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
 from urllib.parse import urlparse
 
-from dotenv import load_dotenv
 from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
+from fastapi.responses import StreamingResponse
+import orjson
 from pydantic import BaseModel, Field
-import pymysql
 
-load_dotenv()
+if TYPE_CHECKING:
+    from asyncmy.pool import Pool
+    from openai import AsyncOpenAI
+
+# openai, asyncmy and dotenv are imported on first use so idle
+# workers don't pay for them at fork time.
+if os.getenv("ATFOOD_LOAD_DOTENV"):
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPEN_MODEL = os.getenv("OPEN_MODEL")
 ATFOOD_MODEL = os.getenv("ATFOOD_MODEL")
 ATFOOD_API_TOKEN = os.getenv("ATFOOD_API_TOKEN")
 ATFOOD_CORS_ORIGINS = os.getenv("ATFOOD_CORS_ORIGINS", "")
+ATFOOD_ENV = os.getenv("ATFOOD_ENV", "production")
 DATABASE_URI = os.getenv("DATABASE_URI")
-OPEN_INPUT_PRICE_PER_1K = Decimal(os.getenv("OPEN_INPUT_PRICE_PER_1K", "0"))
-OPEN_OUTPUT_PRICE_PER_1K = Decimal(os.getenv("OPEN_OUTPUT_PRICE_PER_1K", "0"))
+ATFOOD_PROMPT_ID = os.getenv("ATFOOD_PROMPT_ID")
+ATFOOD_PROMPT_VERSION = os.getenv("ATFOOD_PROMPT_VERSION")
+ATFOOD_PROMPT_CACHE_KEY = os.getenv("ATFOOD_PROMPT_CACHE_KEY", "atfood")
+# Prices are kept as integer micro-dollars per 1K tokens so per-request cost
+# math stays in plain ints.
+OPEN_INPUT_PRICE_MICROS_PER_1K = int(
+    Decimal(os.getenv("OPEN_INPUT_PRICE_PER_1K", "0")) * 1_000_000
+)
+OPEN_OUTPUT_PRICE_MICROS_PER_1K = int(
+    Decimal(os.getenv("OPEN_OUTPUT_PRICE_PER_1K", "0")) * 1_000_000
+)
 
 LOG_PATH = os.path.join(os.path.expanduser("~"), "logs", "atfoodai", "access.log")
 os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
@@ -45,7 +65,7 @@ if not OPEN_MODEL and not ATFOOD_MODEL:
 if not DATABASE_URI:
     raise RuntimeError("DATABASE_URI is required")
 
-CLIENT = OpenAI(api_key=OPENAI_API_KEY)
+_openai_client: Optional[AsyncOpenAI] = None
 MODEL = ATFOOD_MODEL or OPEN_MODEL
 
 BASE_INSTRUCTIONS = """You are ATFOOD: a chef's curiosity + a critic's honesty.
@@ -104,6 +124,17 @@ ACTION=critic_notes
 - Provide: "Order this / skip that / why it's worth it / how to spot the good version".
 """
 
+# Every call must start with the same prefix for OpenAI's prompt cache to hit:
+# either a stored prompt (ATFOOD_PROMPT_ID, holding BASE_INSTRUCTIONS) or the
+# identical instructions block. The cache key routes requests to warm caches.
+if ATFOOD_PROMPT_ID:
+    PROMPT_KWARGS: Dict[str, Any] = {"prompt": {"id": ATFOOD_PROMPT_ID}}
+    if ATFOOD_PROMPT_VERSION:
+        PROMPT_KWARGS["prompt"]["version"] = ATFOOD_PROMPT_VERSION
+else:
+    PROMPT_KWARGS = {"instructions": BASE_INSTRUCTIONS}
+PROMPT_KWARGS["prompt_cache_key"] = ATFOOD_PROMPT_CACHE_KEY
+
 RECIPE_CONTEXT = {
     "chili_crisp_noodles": {
         "title": "15-minute chili crisp noodles",
@@ -120,53 +151,141 @@ RECIPE_CONTEXT = {
 }
 
 ACTION_PROMPTS = {
-    "open_ai_kitchen": lambda req: (
+    "open_ai_kitchen": (
         "ACTION=open_ai_kitchen\n"
         "Goal: Onboard user into AI Kitchen and collect dish + constraints.\n"
-        f"User text: {req.user_text or ''}\n"
+        "User text: {user_text}\n"
     ),
-    "world_picks": lambda req: (
+    "world_picks": (
         "ACTION=world_picks\n"
         "Goal: Give 'world picks' + a flavor compass. Ask what they want to explore.\n"
-        f"User text: {req.user_text or ''}\n"
+        "User text: {user_text}\n"
     ),
-    "food_era": lambda req: (
+    "food_era": (
         "ACTION=food_era\n"
         "Goal: Build a two-week 'food era' plan with sauces/techniques/dishes.\n"
-        f"User text: {req.user_text or ''}\n"
+        "User text: {user_text}\n"
     ),
-    "adjust_recipe": lambda req: (
+    "adjust_recipe": (
         "ACTION=adjust_recipe\n"
         "Goal: Adapt this recipe without losing soul.\n"
-        f"Recipe: {RECIPE_CONTEXT.get(req.recipe_id or '', {}).get('title', req.recipe_id)}\n"
-        f"Recipe blurb: {RECIPE_CONTEXT.get(req.recipe_id or '', {}).get('blurb', '')}\n"
-        f"User constraints/request: {req.user_text or ''}\n"
+        "Recipe: {recipe_title}\n"
+        "Recipe blurb: {recipe_blurb}\n"
+        "User constraints/request: {user_text}\n"
         "If user gave no constraints, propose 3 good adaptation directions.\n"
     ),
-    "critic_notes": lambda req: (
+    "critic_notes": (
         "ACTION=critic_notes\n"
         "Goal: Punchy critic note expansion.\n"
-        f"Topic: {req.critic_topic or ''}\n"
-        f"User text: {req.user_text or ''}\n"
+        "Topic: {critic_topic}\n"
+        "User text: {user_text}\n"
     ),
 }
 
+_EMPTY_RECIPE: Dict[str, str] = {}
+
+DB_POOL_MIN_SIZE = int(os.getenv("ATFOOD_DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("ATFOOD_DB_POOL_MAX_SIZE", "20"))
+
+SCHEMA_LOCK_TIMEOUT_SECONDS = 60
+MYSQL_ERR_DUP_FIELDNAME = 1060
+MYSQL_ERR_DUP_KEYNAME = 1061
+
+CONV_QUEUE_MAX_SIZE = 10000
+CONV_WRITE_BATCH_SIZE = 50
+CONV_WRITE_INTERVAL_SECONDS = 0.2
+CONV_RETENTION_DAYS = int(os.getenv("ATFOOD_CONVERSATION_RETENTION_DAYS", "90"))
+CONV_PRUNE_INTERVAL_SECONDS = 3600
+CONV_PRUNE_JITTER_SECONDS = 300
+CONV_PRUNE_BATCH_SIZE = 10000
+
+# executemany() rewrites this into one multi-row INSERT per batch, so the
+# server parses the statement once per batch rather than once per row. A
+# server-side PREPARE/EXECUTE would need a SET plus an EXECUTE round trip per
+# row, which costs more than it saves here.
+INSERT_CONVERSATION_SQL = (
+    "INSERT INTO atfood_conversations "
+    "(user_id, action, prompt, response_text, prompt_tokens, response_tokens, "
+    "total_cost, response_id) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+SSE_INITIAL_BATCH_SIZE = 1
+SSE_MAX_BATCH_SIZE = 50
+SSE_FLUSH_INTERVAL_SECONDS = 0.05
+
 RATE_LIMIT_REQUESTS = int(os.getenv("ATFOOD_RATE_LIMIT_REQUESTS", "30"))
 RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("ATFOOD_RATE_LIMIT_WINDOW_SECONDS", "60"))
+RATE_LIMIT_REDIS_URL = os.getenv("ATFOOD_REDIS_URL")
+RATE_LIMIT_SWEEP_INTERVAL_SECONDS = 60
+
+# Token bucket: refills RATE_LIMIT_REQUESTS tokens per window, one token per
+# request. Redis TIME keeps every worker on the same clock.
+RATE_LIMIT_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ttl)
+return allowed
+"""
 
 _rate_buckets: Dict[str, Deque[float]] = defaultdict(deque)
+_rate_limit_redis_down = False
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    _ensure_conversation_table()
-    _ensure_conversation_columns()
-    yield
+    app.state.db_pool = await _create_db_pool()
+    app.state.redis = None
+    app.state.rate_limit_script = None
+    # The in-memory buckets also back the Redis limiter during outages, so
+    # they are swept either way.
+    sweeper = asyncio.create_task(_sweep_rate_buckets())
+    if RATE_LIMIT_REDIS_URL:
+        import redis.asyncio as redis
+
+        app.state.redis = redis.from_url(RATE_LIMIT_REDIS_URL)
+        app.state.rate_limit_script = app.state.redis.register_script(RATE_LIMIT_LUA)
+    await _ensure_conversation_table()
+    app.state.conv_queue = asyncio.Queue(maxsize=CONV_QUEUE_MAX_SIZE)
+    writer = asyncio.create_task(_conversation_writer(app.state.conv_queue))
+    indexer = asyncio.create_task(_ensure_conversation_indexes())
+    pruner = None
+    if CONV_RETENTION_DAYS > 0:
+        pruner = asyncio.create_task(_prune_conversations())
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        if pruner is not None:
+            pruner.cancel()
+        indexer.cancel()
+        # The sentinel lets the writer flush whatever is still queued.
+        await app.state.conv_queue.put(None)
+        await writer
+        app.state.db_pool.close()
+        await app.state.db_pool.wait_closed()
+        if app.state.redis is not None:
+            await app.state.redis.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# In production the frontend is served same-origin behind the proxy, which
+# also owns any CORS headers; only local dev needs the middleware.
 cors_origins = [origin.strip() for origin in ATFOOD_CORS_ORIGINS.split(",") if origin.strip()]
-if cors_origins:
+if ATFOOD_ENV == "dev" and cors_origins:
     app.add_middleware(
         CORSMiddleware,
         allow_origins=cors_origins,
@@ -193,7 +312,7 @@ class AtfoodResponse(BaseModel):
 
 def _parse_database_uri(uri: str) -> dict:
     parsed = urlparse(uri)
-    if parsed.scheme not in {"mysql", "mysql+pymysql"}:
+    if parsed.scheme not in {"mysql", "mysql+pymysql", "mysql+asyncmy"}:
         raise RuntimeError("DATABASE_URI must be a MySQL connection string")
     if not parsed.hostname or not parsed.username or not parsed.path:
         raise RuntimeError("DATABASE_URI is missing required fields")
@@ -206,6 +325,9 @@ def _parse_database_uri(uri: str) -> dict:
     }
 
 
+DB_CONFIG = _parse_database_uri(DATABASE_URI)
+
+
 def _payload_to_dict(payload: AtfoodRequest) -> dict:
     if hasattr(payload, "model_dump"):
         return payload.model_dump()
@@ -232,67 +354,146 @@ def _log_event(event: str, data: dict) -> None:
     _logger.info(json.dumps(payload, ensure_ascii=True, default=str))
 
 
-def _get_db_connection():
-    cfg = _parse_database_uri(DATABASE_URI)
-    return pymysql.connect(
-        host=cfg["host"],
-        user=cfg["user"],
-        password=cfg["password"],
-        database=cfg["database"],
-        port=cfg["port"],
+def _get_openai() -> AsyncOpenAI:
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+
+async def _create_db_pool() -> Pool:
+    import asyncmy
+
+    return await asyncmy.create_pool(
+        minsize=DB_POOL_MIN_SIZE,
+        maxsize=DB_POOL_MAX_SIZE,
+        host=DB_CONFIG["host"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        database=DB_CONFIG["database"],
+        port=DB_CONFIG["port"],
         charset="utf8mb4",
         autocommit=True,
     )
 
 
-def _ensure_conversation_table():
-    with _get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(
+def _get_db_connection():
+    # Leaving the async with block releases the connection to the pool.
+    return app.state.db_pool.acquire()
+
+
+def _is_mysql_error(exc: Exception, *codes: int) -> bool:
+    return bool(exc.args) and exc.args[0] in codes
+
+
+async def _ensure_conversation_table():
+    upgrade_columns = {
+        "prompt_tokens": "INT DEFAULT 0",
+        "response_tokens": "INT DEFAULT 0",
+        "total_cost": "DECIMAL(12,6) DEFAULT 0",
+        "response_id": "VARCHAR(128) DEFAULT NULL",
+        "total_cost_micros": (
+            "BIGINT UNSIGNED AS (CAST(total_cost * 1000000 AS UNSIGNED)) VIRTUAL"
+        ),
+    }
+    async with _get_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS atfood_conversations (
                     id BIGINT AUTO_INCREMENT PRIMARY KEY,
                     user_id VARCHAR(128) NOT NULL,
                     action VARCHAR(64) NOT NULL,
-                    prompt TEXT NOT NULL,
-                    response_text TEXT NOT NULL,
+                    prompt MEDIUMTEXT NOT NULL,
+                    response_text MEDIUMTEXT NOT NULL,
                     prompt_tokens INT DEFAULT 0,
                     response_tokens INT DEFAULT 0,
                     total_cost DECIMAL(12,6) DEFAULT 0,
+                    response_id VARCHAR(128) DEFAULT NULL,
+                    total_cost_micros BIGINT UNSIGNED
+                        AS (CAST(total_cost * 1000000 AS UNSIGNED)) VIRTUAL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_user_created (user_id, created_at)
-                )
+                    INDEX idx_user_created (user_id, created_at),
+                    INDEX idx_action_created (action, created_at),
+                    INDEX idx_user_action (user_id, action, created_at),
+                    INDEX idx_cost (total_cost_micros),
+                    INDEX idx_created (created_at)
+                ) ROW_FORMAT=DYNAMIC
                 """
             )
-
-
-def _ensure_conversation_columns():
-    required_columns = {
-        "prompt_tokens": "INT DEFAULT 0",
-        "response_tokens": "INT DEFAULT 0",
-        "total_cost": "DECIMAL(12,6) DEFAULT 0",
-        "response_id": "VARCHAR(128) DEFAULT NULL",
-    }
-    with _get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT COLUMN_NAME
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'atfood_conversations'
-                """,
-                (conn.db.decode() if isinstance(conn.db, bytes) else conn.db,),
+            # Tables created by older releases may predate some columns. Every
+            # worker boots through here, so the check and ALTER run under a
+            # named lock and the columns are re-read once it is held. Adding
+            # these columns is a metadata-only change, so boot isn't held up.
+            await cursor.execute(
+                "SELECT GET_LOCK('atfood_schema', %s)", (SCHEMA_LOCK_TIMEOUT_SECONDS,)
             )
-            existing = {row[0] for row in cursor.fetchall()}
-            for column, definition in required_columns.items():
-                if column in existing:
-                    continue
-                cursor.execute(
-                    f"ALTER TABLE atfood_conversations ADD COLUMN {column} {definition}"
-                )
-
-
-def _store_conversation(
+            await cursor.fetchone()
+            try:
+                # A zero-row SELECT reports the live columns without touching
+                # INFORMATION_SCHEMA.
+                await cursor.execute("SELECT * FROM atfood_conversations LIMIT 0")
+                existing = {column[0] for column in cursor.description}
+                missing = [
+                    f"ADD COLUMN {column} {definition}"
+                    for column, definition in upgrade_columns.items()
+                    if column not in existing
+                ]
+                if missing:
+                    try:
+                        await cursor.execute(
+                            f"ALTER TABLE atfood_conversations {', '.join(missing)}"
+                        )
+                    except Exception as exc:
+                        # Another worker got there first (lock timed out).
+                        if not _is_mysql_error(exc, MYSQL_ERR_DUP_FIELDNAME):
+                            raise
+            finally:
+                await cursor.execute("SELECT RELEASE_LOCK('atfood_schema')")
+
+
+async def _ensure_conversation_indexes() -> None:
+    # Building indexes on a large existing table can take minutes, so this runs
+    # as a background task after boot, and only in the worker that wins the
+    # lock. Indexes are built online; the table stays writable meanwhile.
+    upgrade_indexes = {
+        "idx_action_created": "(action, created_at)",
+        "idx_user_action": "(user_id, action, created_at)",
+        "idx_cost": "(total_cost_micros)",
+        "idx_created": "(created_at)",
+    }
+    try:
+        async with _get_db_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK('atfood_schema_indexes', 0)")
+                row = await cursor.fetchone()
+                if not row or row[0] != 1:
+                    return
+                try:
+                    await cursor.execute("SHOW INDEX FROM atfood_conversations")
+                    existing = {row[2] for row in await cursor.fetchall()}
+                    missing = [
+                        f"ADD INDEX {index} {columns}"
+                        for index, columns in upgrade_indexes.items()
+                        if index not in existing
+                    ]
+                    if missing:
+                        try:
+                            await cursor.execute(
+                                f"ALTER TABLE atfood_conversations {', '.join(missing)}"
+                            )
+                        except Exception as exc:
+                            if not _is_mysql_error(exc, MYSQL_ERR_DUP_KEYNAME):
+                                raise
+                finally:
+                    await cursor.execute("SELECT RELEASE_LOCK('atfood_schema_indexes')")
+    except Exception:
+        _logger.exception("Failed to add conversation indexes")
+
+
+def _enqueue_conversation(
     user_id: str,
     action: str,
     prompt: str,
@@ -302,39 +503,101 @@ def _store_conversation(
     total_cost: Decimal,
     response_id: Optional[str],
 ) -> None:
-    with _get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO atfood_conversations (
-                    user_id,
-                    action,
-                    prompt,
-                    response_text,
-                    prompt_tokens,
-                    response_tokens,
-                    total_cost,
-                    response_id
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    user_id,
-                    action,
-                    prompt,
-                    response_text,
-                    prompt_tokens,
-                    response_tokens,
-                    str(total_cost),
-                    response_id,
-                ),
-            )
+    row = (
+        user_id,
+        action,
+        prompt,
+        response_text,
+        prompt_tokens,
+        response_tokens,
+        str(total_cost),
+        response_id,
+    )
+    try:
+        app.state.conv_queue.put_nowait(row)
+    except asyncio.QueueFull:
+        _logger.error("Conversation queue full; dropping row for user %s", user_id)
+
+
+async def _store_conversations(rows: List[tuple]) -> None:
+    async with _get_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.executemany(INSERT_CONVERSATION_SQL, rows)
+
+
+async def _conversation_writer(queue: asyncio.Queue) -> None:
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        row = await queue.get()
+        if row is None:
+            break
+        rows = [row]
+        deadline = loop.time() + CONV_WRITE_INTERVAL_SECONDS
+        while len(rows) < CONV_WRITE_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                stopping = True
+                break
+            rows.append(row)
+        try:
+            await _store_conversations(rows)
+        except Exception:
+            _logger.exception("Failed to store %d conversation rows", len(rows))
+
+
+async def _delete_expired_conversations() -> None:
+    async with _get_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            # Every worker runs a pruner; the named lock lets only one of them
+            # delete at a time instead of N loops fighting over the same rows.
+            await cursor.execute("SELECT GET_LOCK('atfood_prune', 0)")
+            row = await cursor.fetchone()
+            if not row or row[0] != 1:
+                return
+            try:
+                # Bounded batches keep each statement's locks and undo log
+                # small, so pruning never stalls the conversation writer.
+                while True:
+                    await cursor.execute(
+                        """
+                        DELETE FROM atfood_conversations
+                        WHERE created_at < NOW() - INTERVAL %s DAY
+                        LIMIT %s
+                        """,
+                        (CONV_RETENTION_DAYS, CONV_PRUNE_BATCH_SIZE),
+                    )
+                    if cursor.rowcount < CONV_PRUNE_BATCH_SIZE:
+                        break
+            finally:
+                await cursor.execute("SELECT RELEASE_LOCK('atfood_prune')")
+
+
+async def _prune_conversations() -> None:
+    # The first pass only waits out a short jitter so workers that restart
+    # often still prune; GET_LOCK keeps them from deleting at the same time.
+    delay = random.uniform(0, CONV_PRUNE_JITTER_SECONDS)
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await _delete_expired_conversations()
+        except Exception:
+            _logger.exception("Failed to prune old conversations")
+        delay = CONV_PRUNE_INTERVAL_SECONDS + random.uniform(
+            0, CONV_PRUNE_JITTER_SECONDS
+        )
 
 
-def _fetch_last_response_id(user_id: str) -> Optional[str]:
-    with _get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(
+async def _fetch_last_response_id(user_id: str) -> Optional[str]:
+    async with _get_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
                 """
                 SELECT response_id
                 FROM atfood_conversations
@@ -344,11 +607,43 @@ def _fetch_last_response_id(user_id: str) -> Optional[str]:
                 """,
                 (user_id,),
             )
-            row = cursor.fetchone()
+            row = await cursor.fetchone()
     return row[0] if row and row[0] else None
 
 
-def enforce_rate_limit(client_ip: str) -> None:
+async def enforce_rate_limit(client_ip: str) -> None:
+    global _rate_limit_redis_down
+    script = app.state.rate_limit_script
+    if script is None:
+        _enforce_local_rate_limit(client_ip)
+        return
+    try:
+        allowed = await script(
+            keys=[f"atfood:rate:{client_ip}"],
+            args=[
+                RATE_LIMIT_REQUESTS,
+                RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW_SECONDS,
+                RATE_LIMIT_WINDOW_SECONDS,
+            ],
+        )
+    except Exception as exc:
+        # Keep serving on a Redis outage, limited per worker in the meantime.
+        # Only the transition is logged so an outage doesn't flood the log.
+        if not _rate_limit_redis_down:
+            _rate_limit_redis_down = True
+            _logger.warning(
+                "Rate limit Redis unavailable, using in-memory limit: %s", exc
+            )
+        _enforce_local_rate_limit(client_ip)
+        return
+    if _rate_limit_redis_down:
+        _rate_limit_redis_down = False
+        _logger.warning("Rate limit Redis available again")
+    if not allowed:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
+
+def _enforce_local_rate_limit(client_ip: str) -> None:
     now = time.monotonic()
     window = _rate_buckets[client_ip]
     cutoff = now - RATE_LIMIT_WINDOW_SECONDS
@@ -359,29 +654,77 @@ def enforce_rate_limit(client_ip: str) -> None:
     window.append(now)
 
 
+async def _sweep_rate_buckets() -> None:
+    # Drop windows with no hits inside the current window so one-off client
+    # IPs don't keep their bucket forever.
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL_SECONDS)
+        cutoff = time.monotonic() - RATE_LIMIT_WINDOW_SECONDS
+        stale = [
+            client_ip
+            for client_ip, window in _rate_buckets.items()
+            if not window or window[-1] < cutoff
+        ]
+        for client_ip in stale:
+            del _rate_buckets[client_ip]
+
+
 def extract_output_text(response) -> str:
     output_text = getattr(response, "output_text", None)
     if output_text:
         return output_text
-    output = getattr(response, "output", None) or []
-    parts = []
-    for item in output:
-        if getattr(item, "type", None) != "message":
-            continue
-        for content in getattr(item, "content", None) or []:
-            if getattr(content, "type", None) == "output_text":
-                parts.append(getattr(content, "text", ""))
-    return "".join(parts)
+    get = getattr
+    return "".join(
+        get(content, "text", "")
+        for item in get(response, "output", None) or ()
+        if get(item, "type", None) == "message"
+        for content in get(item, "content", None) or ()
+        if get(content, "type", None) == "output_text"
+    )
 
 
-@app.post("/api/atfood", response_model=AtfoodResponse)
-def atfood_endpoint(
+def _extract_usage(response) -> tuple:
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "input_tokens", None)
+    if prompt_tokens is None:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0)
+    response_tokens = getattr(usage, "output_tokens", None)
+    if response_tokens is None:
+        response_tokens = getattr(usage, "completion_tokens", 0)
+    return int(prompt_tokens or 0), int(response_tokens or 0)
+
+
+def _compute_cost(prompt_tokens: int, response_tokens: int) -> Decimal:
+    cost_micros = (
+        prompt_tokens * OPEN_INPUT_PRICE_MICROS_PER_1K
+        + response_tokens * OPEN_OUTPUT_PRICE_MICROS_PER_1K
+    ) // 1000
+    return Decimal(cost_micros) / 1_000_000
+
+
+def _log_error_response(
+    status: int, detail: Any, start_time: float, client_ip: str, user_id: str
+) -> None:
+    duration_ms = int((time.monotonic() - start_time) * 1000)
+    _log_event(
+        "response",
+        {
+            "status": status,
+            "detail": detail,
+            "duration_ms": duration_ms,
+            "client_ip": client_ip,
+            "user_id": user_id,
+        },
+    )
+
+
+async def _prepare_request(
     payload: AtfoodRequest,
     request: Request,
-    x_atfood_token: Optional[str] = Header(None, alias="X-ATFOOD-TOKEN"),
-    x_atfood_user: Optional[str] = Header(None, alias="X-ATFOOD-USER"),
-) -> AtfoodResponse:
-    start_time = time.monotonic()
+    x_atfood_token: Optional[str],
+    x_atfood_user: Optional[str],
+    start_time: float,
+) -> tuple:
     client_ip = request.client.host if request.client else "unknown"
     user_id = (x_atfood_user or "").strip() or client_ip or "demo-user"
     _log_event(
@@ -399,83 +742,72 @@ def atfood_endpoint(
 
     if ATFOOD_API_TOKEN and x_atfood_token:
         if x_atfood_token != ATFOOD_API_TOKEN:
-            duration_ms = int((time.monotonic() - start_time) * 1000)
-            _log_event(
-                "response",
-                {
-                    "status": 401,
-                    "detail": "Invalid token",
-                    "duration_ms": duration_ms,
-                    "client_ip": client_ip,
-                    "user_id": user_id,
-                },
-            )
+            _log_error_response(401, "Invalid token", start_time, client_ip, user_id)
             raise HTTPException(status_code=401, detail="Invalid token")
 
     try:
-        enforce_rate_limit(client_ip)
+        await enforce_rate_limit(client_ip)
     except HTTPException as exc:
-        duration_ms = int((time.monotonic() - start_time) * 1000)
-        _log_event(
-            "response",
-            {
-                "status": exc.status_code,
-                "detail": exc.detail,
-                "duration_ms": duration_ms,
-                "client_ip": client_ip,
-                "user_id": user_id,
-            },
-        )
+        _log_error_response(exc.status_code, exc.detail, start_time, client_ip, user_id)
         raise
 
-    prompt_builder = ACTION_PROMPTS.get(payload.action)
-    if not prompt_builder:
-        duration_ms = int((time.monotonic() - start_time) * 1000)
-        _log_event(
-            "response",
-            {
-                "status": 400,
-                "detail": "Unknown action",
-                "duration_ms": duration_ms,
-                "client_ip": client_ip,
-                "user_id": user_id,
-            },
-        )
+    template = ACTION_PROMPTS.get(payload.action)
+    if not template:
+        _log_error_response(400, "Unknown action", start_time, client_ip, user_id)
         raise HTTPException(status_code=400, detail="Unknown action")
 
-    prompt = prompt_builder(payload)
+    prompt = _build_prompt(template, payload)
     if payload.prefs:
         prompt = f"{prompt}Prefs: {payload.prefs}\n"
     if payload.session_id:
         prompt = f"{prompt}Session: {payload.session_id}\n"
+    return client_ip, user_id, prompt
+
+
+def _build_prompt(template: str, payload: AtfoodRequest) -> str:
+    recipe = RECIPE_CONTEXT.get(payload.recipe_id or "", _EMPTY_RECIPE)
+    return template.format_map(
+        {
+            "user_text": payload.user_text or "",
+            "recipe_title": recipe.get("title", payload.recipe_id),
+            "recipe_blurb": recipe.get("blurb", ""),
+            "critic_topic": payload.critic_topic or "",
+        }
+    )
+
+
+def _sse_event(data: dict) -> bytes:
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.post("/api/atfood", response_model=AtfoodResponse)
+async def atfood_endpoint(
+    payload: AtfoodRequest,
+    request: Request,
+    x_atfood_token: Optional[str] = Header(None, alias="X-ATFOOD-TOKEN"),
+    x_atfood_user: Optional[str] = Header(None, alias="X-ATFOOD-USER"),
+) -> AtfoodResponse:
+    start_time = time.monotonic()
+    client_ip, user_id, prompt = await _prepare_request(
+        payload, request, x_atfood_token, x_atfood_user, start_time
+    )
 
     try:
-        previous_response_id = _fetch_last_response_id(user_id)
-        response = CLIENT.responses.create(
+        previous_response_id = await _fetch_last_response_id(user_id)
+        response = await _get_openai().responses.create(
             model=MODEL,
-            instructions=BASE_INSTRUCTIONS,
+            **PROMPT_KWARGS,
             input=prompt,
             previous_response_id=previous_response_id,
         )
-        usage = getattr(response, "usage", None)
-        prompt_tokens = getattr(usage, "input_tokens", None)
-        if prompt_tokens is None:
-            prompt_tokens = getattr(usage, "prompt_tokens", 0)
-        response_tokens = getattr(usage, "output_tokens", None)
-        if response_tokens is None:
-            response_tokens = getattr(usage, "completion_tokens", 0)
-        prompt_tokens = int(prompt_tokens or 0)
-        response_tokens = int(response_tokens or 0)
-        total_cost = (
-            (Decimal(prompt_tokens) * OPEN_INPUT_PRICE_PER_1K)
-            + (Decimal(response_tokens) * OPEN_OUTPUT_PRICE_PER_1K)
-        ) / Decimal("1000")
+        prompt_tokens, response_tokens = _extract_usage(response)
+        total_cost = _compute_cost(prompt_tokens, response_tokens)
         text = extract_output_text(response).strip()
         if not text:
             raise HTTPException(status_code=502, detail="Empty response from model")
 
         response_id = getattr(response, "id", None)
-        _store_conversation(
+        _enqueue_conversation(
             user_id,
             payload.action,
             prompt,
@@ -510,29 +842,156 @@ def atfood_endpoint(
             total_cost=total_cost,
         )
     except HTTPException as exc:
-        duration_ms = int((time.monotonic() - start_time) * 1000)
-        _log_event(
-            "response",
-            {
-                "status": exc.status_code,
-                "detail": exc.detail,
-                "duration_ms": duration_ms,
-                "client_ip": client_ip,
-                "user_id": user_id,
-            },
-        )
+        _log_error_response(exc.status_code, exc.detail, start_time, client_ip, user_id)
         raise
     except Exception as exc:
-        duration_ms = int((time.monotonic() - start_time) * 1000)
-        _log_event(
-            "response",
-            {
-                "status": 500,
-                "detail": str(exc),
-                "duration_ms": duration_ms,
-                "client_ip": client_ip,
-                "user_id": user_id,
-            },
+        _log_error_response(500, str(exc), start_time, client_ip, user_id)
+        _logger.exception("Unhandled exception while processing request")
+        raise
+
+
+@app.post("/api/atfood/stream")
+async def atfood_stream_endpoint(
+    payload: AtfoodRequest,
+    request: Request,
+    x_atfood_token: Optional[str] = Header(None, alias="X-ATFOOD-TOKEN"),
+    x_atfood_user: Optional[str] = Header(None, alias="X-ATFOOD-USER"),
+) -> StreamingResponse:
+    start_time = time.monotonic()
+    client_ip, user_id, prompt = await _prepare_request(
+        payload, request, x_atfood_token, x_atfood_user, start_time
+    )
+
+    try:
+        previous_response_id = await _fetch_last_response_id(user_id)
+        stream = await _get_openai().responses.create(
+            model=MODEL,
+            **PROMPT_KWARGS,
+            input=prompt,
+            previous_response_id=previous_response_id,
+            stream=True,
         )
+    except Exception as exc:
+        _log_error_response(500, str(exc), start_time, client_ip, user_id)
         _logger.exception("Unhandled exception while processing request")
         raise
+
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        parts = []
+        batch = []
+        batch_size = SSE_INITIAL_BATCH_SIZE
+        last_flush = loop.time()
+        completed = None
+        events = stream.__aiter__()
+        pending = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(events.__anext__())
+                # While tokens are buffered, wait no longer than the flush
+                # interval so a pause in generation doesn't hold them back.
+                timeout = None
+                if batch:
+                    timeout = max(
+                        0, SSE_FLUSH_INTERVAL_SECONDS - (loop.time() - last_flush)
+                    )
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    flush = True
+                else:
+                    try:
+                        event = pending.result()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        pending = None
+                    event_type = getattr(event, "type", None)
+                    flush = False
+                    if event_type == "response.output_text.delta":
+                        parts.append(event.delta)
+                        batch.append(event.delta)
+                        flush = len(batch) >= batch_size
+                    elif event_type in {"response.completed", "response.incomplete"}:
+                        # Truncated answers still carry real usage and an id to
+                        # chain.
+                        completed = event.response
+                    elif event_type in {"response.failed", "error"}:
+                        raise RuntimeError(f"Model stream failed: {event_type}")
+                # Start with tiny batches for a fast first paint, then grow
+                # them so long answers don't pay one frame per token.
+                if flush and batch:
+                    yield _sse_event({"tokens": batch})
+                    batch = []
+                    batch_size = min(batch_size * 3, SSE_MAX_BATCH_SIZE)
+                    last_flush = loop.time()
+            if batch:
+                yield _sse_event({"tokens": batch})
+
+            text = "".join(parts).strip()
+            if not text:
+                _log_error_response(
+                    502, "Empty response from model", start_time, client_ip, user_id
+                )
+                yield _sse_event({"error": "Empty response from model"})
+                return
+
+            prompt_tokens, response_tokens = _extract_usage(completed)
+            total_cost = _compute_cost(prompt_tokens, response_tokens)
+            response_id = getattr(completed, "id", None)
+            _enqueue_conversation(
+                user_id,
+                payload.action,
+                prompt,
+                text,
+                prompt_tokens,
+                response_tokens,
+                total_cost,
+                response_id,
+            )
+            duration_ms = int((time.monotonic() - start_time) * 1000)
+            _log_event(
+                "response",
+                {
+                    "status": 200,
+                    "stream": True,
+                    "duration_ms": duration_ms,
+                    "client_ip": client_ip,
+                    "user_id": user_id,
+                    "model": MODEL,
+                    "prompt": prompt,
+                    "response_text": text,
+                    "prompt_tokens": prompt_tokens,
+                    "response_tokens": response_tokens,
+                    "total_cost": total_cost,
+                    "response_id": response_id,
+                    "previous_response_id": previous_response_id,
+                },
+            )
+            yield _sse_event(
+                {
+                    "done": True,
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "response_tokens": response_tokens,
+                        "total_cost": str(total_cost),
+                    },
+                }
+            )
+        except Exception as exc:
+            # Headers are already sent, so report the failure in-band.
+            _log_error_response(500, str(exc), start_time, client_ip, user_id)
+            _logger.exception("Unhandled exception while streaming response")
+            yield _sse_event({"error": "Internal server error"})
+        finally:
+            # Also runs when the client disconnects mid-stream, so the model
+            # stops generating instead of running on until garbage collection.
+            if pending is not None:
+                pending.cancel()
+            await stream.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )